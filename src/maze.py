@@ -1,8 +1,12 @@
-from typing import List, Dict, Tuple, Set
-import random
+from typing import List, Dict, Tuple
+import sys
+
+import numpy as np
 
 from room import Room
 
+from numba import njit
+
 example_config = {
     "maze_size": (2, 9, 9),  # (height, rows, columns)
     "start_loc": (0, 3, 3),  # start room will be (loc0: loc0+size0, loc1: loc1+size1, loc2: loc2+size2)
@@ -10,9 +14,169 @@ example_config = {
     "goal_loc": (0, 0, 0),   # goal room will be (loc0: loc0+size0, loc1: loc1+size1, loc2: loc2+size2)
     "goal_room_size": (1, 1, 1),
     "max_room_size": (2, 2, 2),   # the maximum size of any room on each dimension
+    "seed": 1,   # optional, seed of the random generator. A random maze is generated every time if it is not given
 }
 
-random.seed(1)
+# value of an unoccupied cell in the maze grid, room ids are 0 (start), -1 (goal) or positive
+EMPTY = -2
+
+
+@njit(cache=True)
+def _is_empty(maze: np.ndarray, h0: int, h1: int, r0: int, r1: int, c0: int, c1: int) -> bool:
+    """
+    Check whether all the cells in maze[h0:h1, r0:r1, c0:c1] are EMPTY, stopping at the first occupied cell.
+    """
+    for hi in range(h0, h1):
+        for ri in range(r0, r1):
+            for ci in range(c0, c1):
+                if maze[hi, ri, ci] != EMPTY:
+                    return False
+    return True
+
+
+@njit(cache=True)
+def _pack_rooms(maze: np.ndarray, max_h: int, max_r: int, max_c: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Fill all the EMPTY cells of the maze grid with rooms of random sizes, the room ids are written into the grid in
+    place. The cells are visited floor by floor, and each empty cell becomes the top left corner of a new room.
+    Args:
+        maze: the maze grid, with the start and goal rooms already set.
+        max_h: maximum room size on the height dimension.
+        max_r: maximum room size on the rows dimension.
+        max_c: maximum room size on the columns dimension.
+        rng: the maze's random generator, used for the room sizes.
+    Returns:
+        An int32 array with one (h, r, c, size_h, size_r, size_c, id) row per new room, ids start from 1.
+    """
+    mh, mr, mc = maze.shape
+    rooms = np.empty((mh * mr * mc, 7), dtype=np.int32)
+    n = 0
+    for hi in range(mh):
+        for ri in range(mr):
+            for ci in range(mc):
+                # skip the cell if it is already occupied by a room
+                if maze[hi, ri, ci] != EMPTY:
+                    continue
+                # explore downwards to see the maximum height we can fit a room in.
+                max_room_h = 1
+                while max_room_h < max_h and hi + max_room_h < mh and maze[hi + max_room_h, ri, ci] == EMPTY:
+                    max_room_h += 1
+                # determine the room height randomly within the limit
+                room_h = rng.integers(1, max_room_h + 1)
+                # now we have determined the height of the room, we can explore horizontally to determine the max row
+                # and columns we can fit a room in.
+                max_room_r = 1
+                while (max_room_r < max_r and ri + max_room_r < mr
+                       and _is_empty(maze, hi, hi + room_h, ri + max_room_r, ri + max_room_r + 1, ci, ci + 1)):
+                    max_room_r += 1
+                room_r = rng.integers(1, max_room_r + 1)
+                # explore along the columns with the height and rows determined above.
+                max_room_c = 1
+                if room_h == room_r == 1:
+                    # a single cell wide room, only one cell to check on each step
+                    while max_room_c < max_c and ci + max_room_c < mc and maze[hi, ri, ci + max_room_c] == EMPTY:
+                        max_room_c += 1
+                else:
+                    while (max_room_c < max_c and ci + max_room_c < mc
+                           and _is_empty(maze, hi, hi + room_h, ri, ri + room_r, ci + max_room_c, ci + max_room_c + 1)):
+                        max_room_c += 1
+                if (room_h == 1) != (room_r == 1):
+                    # a room that is flat on exactly one dimension only takes one column, unless it is on the last
+                    # floor or row, where it takes all the columns it can.
+                    room_c = max_room_c if hi == mh - 1 or ri == mr - 1 else 1
+                else:
+                    room_c = rng.integers(1, max_room_c + 1)
+                # fill the grid with the room
+                n += 1
+                maze[hi:hi + room_h, ri:ri + room_r, ci:ci + room_c] = n
+                rooms[n - 1, 0] = hi
+                rooms[n - 1, 1] = ri
+                rooms[n - 1, 2] = ci
+                rooms[n - 1, 3] = room_h
+                rooms[n - 1, 4] = room_r
+                rooms[n - 1, 5] = room_c
+                rooms[n - 1, 6] = n
+    return rooms[:n]
+
+
+@njit(cache=True)
+def _pop_unvisited_neighbor(indptr: np.ndarray, indices: np.ndarray, remaining: np.ndarray, n_remaining: np.ndarray,
+                            visited: np.ndarray, room: int, rng: np.random.Generator) -> int:
+    """
+    Pick a random neighbour of the room that is not visited yet, and return its CSR slot. remaining holds the CSR
+    slots of the neighbours of every room, only the first n_remaining[room] of them have not been picked yet. A
+    picked slot is swapped behind them, so each neighbour is looked at once at most over the whole walk. Returns -1
+    if all the neighbours are visited.
+    """
+    start = indptr[room]
+    while n_remaining[room] > 0:
+        last = start + n_remaining[room] - 1
+        k = start + rng.integers(0, n_remaining[room])
+        slot = remaining[k]
+        remaining[k], remaining[last] = remaining[last], slot
+        n_remaining[room] -= 1
+        if not visited[indices[slot]]:
+            return slot
+    return -1
+
+
+@njit(cache=True)
+def _spanning_tree(indptr: np.ndarray, indices: np.ndarray,
+                   rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generate a random spanning tree of the room network, see Maze._generate_spanning_tree().
+    Rooms are referred to by their rows, a row is the room id except for the goal room which takes the last row.
+    Args:
+        indptr: CSR row pointers of the room network.
+        indices: CSR neighbour rows of the room network.
+        rng: the maze's random generator, used for the random walk.
+    Returns:
+        The parent row of every room in the tree (-1 for the start room), the CSR slot of the edge from its parent
+        (-1 for the start room), and the rows in the order they joined the tree.
+    """
+    n = len(indptr) - 1
+    goal = n - 1
+    parent = np.full(n, -1, dtype=np.int32)
+    parent_slot = np.full(n, -1, dtype=np.int32)
+    order = np.empty(n, dtype=np.int32)
+    visited = np.zeros(n, dtype=np.bool_)
+    stack = np.empty(n, dtype=np.int32)
+    remaining = np.arange(len(indices), dtype=np.int32)
+    n_remaining = indptr[1:] - indptr[:-1]
+    stack[0], order[0], visited[0] = 0, 0, True
+    top, n_order = 1, 1
+    # Random Depth-First Search to generate a path to the goal
+    # this is also the solution path to the goal.
+    while top > 0:
+        room = stack[top - 1]
+        if room == goal:
+            top -= 1
+            break
+        slot = _pop_unvisited_neighbor(indptr, indices, remaining, n_remaining, visited, room, rng)
+        if slot >= 0:
+            neighbor = indices[slot]
+            stack[top], order[n_order], visited[neighbor] = neighbor, neighbor, True
+            parent[neighbor], parent_slot[neighbor] = room, slot
+            top += 1
+            n_order += 1
+        else:
+            top -= 1
+    # randomly expand the tree
+    while top > 0:
+        i = rng.integers(0, top)
+        room = stack[i]
+        slot = _pop_unvisited_neighbor(indptr, indices, remaining, n_remaining, visited, room, rng)
+        if slot >= 0:
+            neighbor = indices[slot]
+            stack[top], order[n_order], visited[neighbor] = neighbor, neighbor, True
+            parent[neighbor], parent_slot[neighbor] = room, slot
+            top += 1
+            n_order += 1
+        else:
+            # the order of the rooms on the stack does not matter here, so the last one fills the gap
+            stack[i] = stack[top - 1]
+            top -= 1
+    return parent, parent_slot, order[:n_order]
 
 
 class Maze:
@@ -22,18 +186,27 @@ class Maze:
     above.
 
     The class utilises the following internal parameters to hold information about the maze:
-        self.maze: a 3D integer array that stores the most native maze layout. The maze is consisted of rooms with
-        different sizes, each room has a unique id, and occupies a cube shape space in the maze. Self.maze contains
-        the room ids of the room each cell belongs to. The start room is always room 0, and the goal room is -1.
+        self.maze: a 3D NumPy int32 array of shape (height, rows, columns) that stores the most native maze layout.
+        The maze is consisted of rooms with different sizes, each room has a unique id, and occupies a cube shape
+        space in the maze. Self.maze contains the room ids of the room each cell belongs to. The start room is always
+        room 0, and the goal room is -1. Cells that are not occupied yet hold EMPTY (-2).
 
         self.rooms: a dictionary to quickly reference a room by its ID.
 
+        self.neighbor_indptr, self.neighbor_indices, self.neighbor_directions: the network of neighbouring rooms in
+        CSR form, see _generate_maze_network().
+
         self.paths: a dictionary to describe the connectivity of the rooms. Some neighbouring rooms are connected
         by a door, and the doors are randomly generated such that all the rooms are connected in a spanning tree
         fashion, with the start room as the root. Self.paths describes such a tree, its keys are room ids, and the
         values are the room's corresponding parent room id in the spanning tree.
 
-        self.doors: a dictionary to quickly reference the doors by its location (x, y, z).
+        self.door_between: a dictionary to quickly reference the door from one room to another, its keys are
+        (room id, neighbour room id) and the values are (door location cell, direction) as in Room.doors.
+
+        self.door_mask: the doors of all the cells, a 4D boolean array of shape (height, rows, columns, 3).
+        door_mask[h, r, c, d] is True if cell (h, r, c) has a door on its h+1 (d=0), r+1 (d=1) or c+1 (d=2) side,
+        so door_mask[..., 0], door_mask[..., 1] and door_mask[..., 2] are the door grids of each direction.
 
         self.solution_path: a list of room ids that leads from start room to the goal room.
 
@@ -52,15 +225,24 @@ class Maze:
         goal_loc: goal room's starting location, a tuple of 3 values.
         goal_room_size: goal room's size, a tuple of 3 values.
         max_room_size: maximum size of each dimension for any room in the maze. A tuple of 3 values.
+        seed: (optional) seed of the random generator, the same config and seed always generate the same maze.
 
     """
+    # the junction glyphs of the floor plan between four cells a b
+    #                                                          c d
+    # indexed by (a == b) + 2 * (a == c) + 4 * (b == d) + 8 * (c == d). Rooms are boxes, so a == d only when all
+    # four cells are in the same room.
+    _JUNCTIONS = np.array(list('┼┬├├┤ │ ┴─  ┴   '))
+
     def __init__(self, config: Dict):
         self.config = config
         self.mh, self.mr, self.mc = self.config["maze_size"]
         self.rooms: Dict[int, Room] = {}
         self.paths: Dict[int, int] = {}
-        self.doors: Dict[Tuple[int, int, int], Set[int]] = {}
+        self.door_between: Dict[Tuple[int, int], Tuple[Tuple[int, int, int], int]] = {}
         self.solution_path: List[int] = []
+        # all the random numbers are drawn from this generator, the compiled kernels draw from it directly
+        self._rng = np.random.default_rng(self.config.get("seed"))
         # initialise the maze grid
         self._init_maze()
         # randomly fill the maze with rooms
@@ -71,8 +253,10 @@ class Maze:
         self._generate_spanning_tree()
 
     def _init_maze(self):
-        # Maze grid. Each cell will be filled with an integer corresponding to its room id.
-        self.maze: List[List[List[int]]] = [[[None] * self.mc for _ in range(self.mr)] for _ in range(self.mh)]
+        # Maze grid. Each cell will be filled with an integer corresponding to its room id, EMPTY marks a free cell.
+        self.maze: np.ndarray = np.full((self.mh, self.mr, self.mc), EMPTY, dtype=np.int32)
+        # Doors of each cell, towards the next floor, row and column.
+        self.door_mask: np.ndarray = np.zeros((self.mh, self.mr, self.mc, 3), dtype=bool)
         # The starting room has id 0
         self._set_room(self.config["start_loc"], self.config["start_room_size"], 0)
         # The goal room has id -1
@@ -86,93 +270,35 @@ class Maze:
             size: A tuple of the size of the room
             id: The id of the room
         """
-        for hi in range(loc[0], loc[0] + size[0]):
-            for ri in range(loc[1], loc[1] + size[1]):
-                for ci in range(loc[2], loc[2] + size[2]):
-                    self.maze[hi][ri][ci] = id
+        self.maze[loc[0]:loc[0] + size[0], loc[1]:loc[1] + size[1], loc[2]:loc[2] + size[2]] = id
         self.rooms[id] = Room(loc, size, id)
 
     def print_grid(self):
         """
         Utility function for printing the grid values (room ids) layer by layer.
         """
-        for hi in range(self.mh):
-            for ri in range(self.mr):
-                for ci in range(self.mc):
-                    print(self.maze[hi][ri][ci], end="\t")
-                print()
-            print("===============================================")
+        out: List[str] = []
+        for floor in self.maze.tolist():
+            for row in floor:
+                out.append(''.join(f"{room_id}\t" for room_id in row))
+            out.append("===============================================")
+        out.append('')
+        sys.stdout.write('\n'.join(out))
 
     def _generate_rooms(self):
         """
         First step of generating a maze: fill the grid with rooms with random sizes.
         Each room is limited by the maximum size in the config. The smallest room can be 1x1x1.
         A chain of 1x1x1 rooms can be seen as a hallway, therefore it is not necessary to have a hallway type of room.
+        The grid is filled by the compiled _pack_rooms kernel, the Room objects are created from its result.
         """
-        room_id = 1
-        # iterate over all cells in the maze, floor by floor, and try to fill them with rooms
-        for hi in range(self.mh):
-            for ri in range(self.mr):
-                for ci in range(self.mc):
-                    # skip the cell if it is already occupied by a room
-                    if self.maze[hi][ri][ci] is not None:
-                        continue
-                    # explore downwards to see the maximum height we can fit a room in.
-                    max_room_h = 1
-                    while max_room_h < self.config["max_room_size"][0] and hi + max_room_h < self.mh and self.maze[hi + max_room_h][ri][ci] is None:
-                        max_room_h += 1
-                    # determine the room height randomly within the limit
-                    room_h = random.randint(1, max_room_h)
-                    # now we have determined the height of the room, we can explore horizontally to determine the max row and columns we can fit a room in.
-                    max_room_r = 1
-                    while max_room_r < self.config["max_room_size"][1] and ri + max_room_r < self.mr:
-                        can_fill = True
-                        for hj in range(room_h):
-                            if self.maze[hi + hj][ri + max_room_r][ci] is not None:
-                                can_fill = False
-                                break
-                        if not can_fill:
-                            break
-                        max_room_r += 1
-                    room_r = random.randint(1, max_room_r)
-                    if room_h == room_r == 1:
-                        max_room_c = 1
-                        while max_room_c < self.config["max_room_size"][2] and ci + max_room_c < self.mc and self.maze[hi][ri][ci + max_room_c] is None:
-                            max_room_c += 1
-                        room_c = random.randint(1, max_room_c)
-                    elif room_h == 1 or room_r == 1:
-                        room_c = 1
-                        if hi == self.mh - 1 or ri == self.mr - 1:
-                            while room_c < self.config["max_room_size"][2] and ci + room_c < self.mc:
-                                can_fill = True
-                                for hj in range(room_h):
-                                    for rj in range(room_r):
-                                        if self.maze[hi + hj][ri + rj][ci + room_c] is not None:
-                                            can_fill = False
-                                            break
-                                    if not can_fill:
-                                        break
-                                if not can_fill:
-                                    break
-                                room_c += 1
-                    else:
-                        max_room_c = 1
-                        while max_room_c < self.config["max_room_size"][2] and ci + max_room_c < self.mc:
-                            can_fill = True
-                            for hj in range(room_h):
-                                for rj in range(room_r):
-                                    if self.maze[hi + hj][ri + rj][ci + max_room_c] is not None:
-                                        can_fill = False
-                                        break
-                                if not can_fill:
-                                    break
-                            if not can_fill:
-                                break
-                            max_room_c += 1
-                        room_c = random.randint(1, max_room_c)
-                    # fill the grid with the room
-                    self._set_room((hi, ri, ci), (room_h, room_r, room_c), room_id)
-                    room_id += 1
+        max_h, max_r, max_c = self.config["max_room_size"]
+        rooms = _pack_rooms(self.maze, max_h, max_r, max_c, self._rng)
+        for hi, ri, ci, room_h, room_r, room_c, room_id in rooms.tolist():
+            self.rooms[room_id] = Room((hi, ri, ci), (room_h, room_r, room_c), room_id)
+        # the rooms indexed by row, a row is the room id except for the goal room (-1) which is the last one
+        self._room_by_row: List[Room] = [self.rooms[room_id] for room_id in range(len(self.rooms) - 1)]
+        self._room_by_row.append(self.rooms[-1])
 
     def _generate_maze_network(self):
         """
@@ -181,45 +307,32 @@ class Maze:
         This effectively generate a network where each node is a room, and each edge representing the two rooms on
         both sides are neighbours.
         Later, we can generate a spanning tree in the network to generate paths in the maze.
+        The network is stored in CSR form over the room rows (the goal room is row len(self.rooms) - 1):
+        the neighbours of row i are self.neighbor_indices[self.neighbor_indptr[i]:self.neighbor_indptr[i + 1]], and
+        self.neighbor_directions holds their directions.
         """
-        for room in self.rooms.values():
-            # directions: 0=h-1, 1=h+1, 2=r-1, 3=r+1, 4=c-1, 5=c+1
-            direction = 0
-            if room.loc[0] > 0:
-                for ri in range(room.loc[1], room.loc[1] + room.size[1]):
-                    for ci in range(room.loc[2], room.loc[2] + room.size[2]):
-                        neighbor = self.rooms[self.maze[room.loc[0] - 1][ri][ci]]
-                        room.add_neighbor(neighbor, direction)
-            direction = 1
-            if room.loc[0] + room.size[0] < self.mh:
-                for ri in range(room.loc[1], room.loc[1] + room.size[1]):
-                    for ci in range(room.loc[2], room.loc[2] + room.size[2]):
-                        neighbor = self.rooms[self.maze[room.loc[0] + room.size[0]][ri][ci]]
-                        room.add_neighbor(neighbor, direction)
-            direction = 2
-            if room.loc[1] > 0:
-                for hi in range(room.loc[0], room.loc[0] + room.size[0]):
-                    for ci in range(room.loc[2], room.loc[2] + room.size[2]):
-                        neighbor = self.rooms[self.maze[hi][room.loc[1] - 1][ci]]
-                        room.add_neighbor(neighbor, direction)
-            direction = 3
-            if room.loc[1] + room.size[1] < self.mr:
-                for hi in range(room.loc[0], room.loc[0] + room.size[0]):
-                    for ci in range(room.loc[2], room.loc[2] + room.size[2]):
-                        neighbor = self.rooms[self.maze[hi][room.loc[1] + room.size[1]][ci]]
-                        room.add_neighbor(neighbor, direction)
-            direction = 4
-            if room.loc[2] > 0:
-                for hi in range(room.loc[0], room.loc[0] + room.size[0]):
-                    for ri in range(room.loc[1], room.loc[1] + room.size[1]):
-                        neighbor = self.rooms[self.maze[hi][ri][room.loc[2] - 1]]
-                        room.add_neighbor(neighbor, direction)
-            direction = 5
-            if room.loc[2] + room.size[2] < self.mc:
-                for hi in range(room.loc[0], room.loc[0] + room.size[0]):
-                    for ri in range(room.loc[1], room.loc[1] + room.size[1]):
-                        neighbor = self.rooms[self.maze[hi][ri][room.loc[2] + room.size[2]]]
-                        room.add_neighbor(neighbor, direction)
+        n_rooms = len(self.rooms)
+        # the room rows of all the cells, the goal room is stored by its row so all the values are non-negative
+        rows = np.where(self.maze == -1, n_rooms - 1, self.maze)
+        # every pair of adjacent cells in different rooms is an edge, in both directions. Each edge is encoded as one
+        # integer key (room * n_rooms + neighbour) * 6 + direction, directions: 0=h-1, 1=h+1, 2=r-1, 3=r+1, 4=c-1,
+        # 5=c+1. A pair of rooms only ever touches on one side, so the keys are unique per pair.
+        keys = []
+        for axis in range(3):
+            lower = rows[(slice(None),) * axis + (slice(None, -1),)]
+            upper = rows[(slice(None),) * axis + (slice(1, None),)]
+            wall = lower != upper
+            lower, upper = lower[wall].astype(np.int64), upper[wall].astype(np.int64)
+            keys.append((lower * n_rooms + upper) * 6 + axis * 2 + 1)
+            keys.append((upper * n_rooms + lower) * 6 + axis * 2)
+        # keep each edge once, sorted by room so they are already in CSR order
+        keys = np.unique(np.concatenate(keys))
+        pairs, directions = np.divmod(keys, 6)
+        room_rows, neighbor_rows = np.divmod(pairs, n_rooms)
+        self.neighbor_indptr: np.ndarray = np.zeros(n_rooms + 1, dtype=np.int32)
+        np.cumsum(np.bincount(room_rows, minlength=n_rooms), out=self.neighbor_indptr[1:])
+        self.neighbor_indices: np.ndarray = neighbor_rows.astype(np.int32)
+        self.neighbor_directions: np.ndarray = directions.astype(np.int8)
 
     def _generate_spanning_tree(self):
         """
@@ -229,46 +342,29 @@ class Maze:
         After a path is created, it randomly expands the tree to gradually connect all the rooms, which will
         generate random dead ends in the maze.
         The maze generated in this way will be a tree structure, i.e. there is no loop in the maze.
+        The tree is generated by the compiled _spanning_tree kernel, the doors are added afterwards in the order the
+        rooms joined the tree.
         """
-        # Random Depth-First Search to generate a path to the goal
-        # this is also the solution path to the goal.
-        stack: List[Room] = [self.rooms[0]]
-        visited = set(stack)
-        while stack:
-            room = stack[-1]
-            if room.id == -1:
-                stack.pop()
-                break
-            neighbors = [n for n in room.neighbors if n not in visited]
-            if neighbors:
-                neighbor = random.choice(neighbors)
-                stack.append(neighbor)
-                visited.add(neighbor)
-                self.paths[neighbor.id] = room.id
-                # add door
-                self._add_door(room, neighbor)
-            else:
-                stack.pop()
-        # randomly expand the tree
-        while stack:
-            i = random.randint(0, len(stack) - 1)
-            room = stack[i]
-            neighbors = [n for n in room.neighbors if n not in visited]
-            if neighbors:
-                neighbor = random.choice(neighbors)
-                stack.append(neighbor)
-                visited.add(neighbor)
-                self.paths[neighbor.id] = room.id
-                # add door
-                self._add_door(room, neighbor)
-            else:
-                stack.pop(i)
+        parent, parent_slot, order = _spanning_tree(self.neighbor_indptr, self.neighbor_indices, self._rng)
+        parent = parent.tolist()
+        # the direction of every room as seen from its parent, read from the network by the slot of the tree edge
+        parent_direction = self.neighbor_directions[np.maximum(parent_slot, 0)].tolist()
+        # the random numbers for the door positions are drawn in one batch, one pair per door
+        door_draws = self._rng.random((len(order) - 1, 2)).tolist()
+        room_by_row, paths, add_door = self._room_by_row, self.paths, self._add_door
+        for row, draws in zip(order[1:].tolist(), door_draws):
+            room, parent_room = room_by_row[row], room_by_row[parent[row]]
+            paths[room.id] = parent_room.id
+            # add door
+            add_door(parent_room, room, parent_direction[row], draws)
         # walk backwards from the goal room to record the correct path.
-        self.solution_path = [-1]
-        while self.solution_path[0] != 0:
-            self.solution_path.insert(0, self.paths[self.solution_path[0]])
+        solution_path = [-1]
+        while solution_path[-1] != 0:
+            solution_path.append(paths[solution_path[-1]])
+        solution_path.reverse()
+        self.solution_path = solution_path
 
-    def _add_door(self, room1: Room, room2: Room):
+    def _add_door(self, room1: Room, room2: Room, direction: int, draws: List[float]):
         """
         Utility function for adding a door between two neighbouring rooms.
         If there are multiple cells that could fit a door, use a random one, except that the door is always
@@ -276,35 +372,32 @@ class Maze:
         Args:
             room1: first room.
             room2: second room.
+            direction: the direction of the second room as seen from the first room, see _generate_maze_network().
+            draws: two random numbers in [0, 1) that pick the door's row and column.
         """
-        direction = room1.neighbors_directions[room1.neighbors.index(room2)]
         if direction % 2 == 0:
             room1, room2 = room2, room1
         door_direction = direction // 2
         if door_direction == 0:
-            dr0 = max(room1.loc[1], room2.loc[1])
-            dr1 = min(room1.loc[1] + room1.size[1], room2.loc[1] + room2.size[1])
-            door_r = random.randint(dr0, dr1 - 1)
-            dc0 = max(room1.loc[2], room2.loc[2])
-            dc1 = min(room1.loc[2] + room1.size[2], room2.loc[2] + room2.size[2])
-            door_c = random.randint(dc0, dc1 - 1)
-            door_h = room1.loc[0] + room1.size[0] - 1
+            dr0, dr1 = max(room1.r0, room2.r0), min(room1.r1, room2.r1)
+            door_r = dr0 + int(draws[0] * (dr1 - dr0))
+            dc0, dc1 = max(room1.c0, room2.c0), min(room1.c1, room2.c1)
+            door_c = dc0 + int(draws[1] * (dc1 - dc0))
+            door_h = room1.h1 - 1
         elif door_direction == 1:
-            door_h = min(room1.loc[0] + room1.size[0], room2.loc[0] + room2.size[0]) - 1
-            dc0 = max(room1.loc[2], room2.loc[2])
-            dc1 = min(room1.loc[2] + room1.size[2], room2.loc[2] + room2.size[2])
-            door_c = random.randint(dc0, dc1 - 1)
-            door_r = room1.loc[1] + room1.size[1] - 1
+            door_h = min(room1.h1, room2.h1) - 1
+            dc0, dc1 = max(room1.c0, room2.c0), min(room1.c1, room2.c1)
+            door_c = dc0 + int(draws[1] * (dc1 - dc0))
+            door_r = room1.r1 - 1
         else:
-            door_h = min(room1.loc[0] + room1.size[0], room2.loc[0] + room2.size[0]) - 1
-            dr0 = max(room1.loc[1], room2.loc[1])
-            dr1 = min(room1.loc[1] + room1.size[1], room2.loc[1] + room2.size[1])
-            door_r = random.randint(dr0, dr1 - 1)
-            door_c = room1.loc[2] + room1.size[2] - 1
-        if (door_h, door_r, door_c) not in self.doors:
-            self.doors[(door_h, door_r, door_c)] = set()
-        self.doors[(door_h, door_r, door_c)].add(door_direction)
-        room1.add_door(room2, (door_h, door_r, door_c), door_direction * 2 + 1)
+            door_h = min(room1.h1, room2.h1) - 1
+            dr0, dr1 = max(room1.r0, room2.r0), min(room1.r1, room2.r1)
+            door_r = dr0 + int(draws[0] * (dr1 - dr0))
+            door_c = room1.c1 - 1
+        door_loc = (door_h, door_r, door_c)
+        self.door_mask[door_loc + (door_direction,)] = True
+        room1.add_door(room2, door_loc, door_direction * 2 + 1)
+        self.door_between[(room1.id, room2.id)] = (door_loc, door_direction * 2 + 1)
         if door_direction == 0:
             door_h += 1
         elif door_direction == 1:
@@ -312,15 +405,13 @@ class Maze:
         else:
             door_c += 1
         room2.add_door(room1, (door_h, door_r, door_c), door_direction * 2)
+        self.door_between[(room2.id, room1.id)] = ((door_h, door_r, door_c), door_direction * 2)
 
     def print_solution_path(self):
         """
         Print the solution path as a chain of rooms (ids) along the path.
         """
-        print(f"{len(self.solution_path) - 1} steps:")
-        for room in self.solution_path[:-1]:
-            print(room, end=" -> ")
-        print(self.solution_path[-1])
+        sys.stdout.write(f"{len(self.solution_path) - 1} steps:\n" + " -> ".join(map(str, self.solution_path)) + "\n")
 
     def print_floor_plan(self, print_solution_path=True):
         """
@@ -332,70 +423,55 @@ class Maze:
         Args:
             print_solution_path: whether to print the solution path on the floor plan.
         """
-        floor_plan: List[List[str]] = [[] for _ in range(self.mh)]
-        for hi in range(self.mh):
-            # top boarder row
-            row_str = '┌'
-            for ci in range(self.mc - 1):
-                if self.maze[hi][0][ci] == self.maze[hi][0][ci + 1]:
-                    row_str += '───'
-                else:
-                    row_str += '──┬'
-            row_str += '──┐'
-            floor_plan[hi].append(row_str)
-            for ri in range(self.mr):
-                # room floor row
-                row_str = '│'
-                for ci in range(self.mc):
-                    if (hi < self.mh - 1 and self.maze[hi][ri][ci] == self.maze[hi + 1][ri][ci]) or ((hi, ri, ci) in self.doors and 0 in self.doors[(hi, ri, ci)]):
-                        row_str += '  '
-                    else:
-                        row_str += '██'
-                    if (ci < self.mc - 1 and self.maze[hi][ri][ci] == self.maze[hi][ri][ci + 1]) or ((hi, ri, ci) in self.doors and 2 in self.doors[(hi, ri, ci)]):
-                        row_str += ' '
-                    else:
-                        row_str += '│'
-                floor_plan[hi].append(row_str)
-                if ri < self.mr - 1:
-                    # room boarder row
-                    row_str = '│' if self.maze[hi][ri][0] == self.maze[hi][ri + 1][0] else '├'
-                    for ci in range(self.mc):
-                        if self.maze[hi][ri][ci] == self.maze[hi][ri + 1][ci] or ((hi, ri, ci) in self.doors and 1 in self.doors[(hi, ri, ci)]):
-                            row_str += '  '
-                        else:
-                            row_str += '──'
-                        if ci == self.mc - 1:
-                            row_str += '│' if self.maze[hi][ri][ci] == self.maze[hi][ri + 1][ci] else '┤'
-                        elif self.maze[hi][ri][ci] == self.maze[hi][ri + 1][ci + 1]:
-                            row_str += ' '
-                        elif self.maze[hi][ri][ci] == self.maze[hi][ri + 1][ci]:
-                            row_str += '│' if self.maze[hi][ri][ci + 1] == self.maze[hi][ri + 1][ci + 1] else '├'
-                        elif self.maze[hi][ri][ci] == self.maze[hi][ri][ci + 1]:
-                            row_str += '─' if self.maze[hi][ri + 1][ci] == self.maze[hi][ri + 1][ci + 1] else '┬'
-                        elif self.maze[hi][ri + 1][ci] == self.maze[hi][ri + 1][ci + 1]:
-                            row_str += '┴'
-                        elif self.maze[hi][ri][ci + 1] == self.maze[hi][ri + 1][ci + 1]:
-                            row_str += '┤'
-                        else:
-                            row_str += '┼'
-                    floor_plan[hi].append(row_str)
-            # bottom boarder row
-            row_str = '└'
-            for ci in range(self.mc - 1):
-                if self.maze[hi][self.mr - 1][ci] == self.maze[hi][self.mr - 1][ci + 1]:
-                    row_str += '───'
-                else:
-                    row_str += '──┴'
-            row_str += '──┘'
-            floor_plan[hi].append(row_str)
+        # the solution path arrows on each floor, as (cell, direction) pairs
+        arrows = [[] for _ in range(self.mh)]
         if print_solution_path:
-            direction_chars = '↥↧↑↓←→'
-            prev_room = self.rooms[self.solution_path[0]]
-            for room_id in self.solution_path[1:]:
-                room = self.rooms[room_id]
-                (hi, ri, ci), direction = prev_room.doors[room]
-                fpi, fpj, fpk = hi, ri * 2 + 1, ci * 3 + 1
-                fpk += direction % 2
-                floor_plan[fpi][fpj] = floor_plan[fpi][fpj][:fpk] + direction_chars[direction] + floor_plan[fpi][fpj][fpk + 1:]
-                prev_room = room
-        print('\n\n'.join(['\n'.join(floor_plan[hi]) for hi in range(self.mh)]))
+            for step in zip(self.solution_path, self.solution_path[1:]):
+                (hi, ri, ci), direction = self.door_between[step]
+                arrows[hi].append(((ri, ci), direction))
+        # the floor plan of a floor is a grid of characters, with a boarder row followed by a room floor row and a
+        # room boarder row for each row of cells. Each cell takes two columns and is followed by a wall column.
+        # A single grid is reused for all the floors, so only one floor is held in memory at a time. The outer
+        # boarders do not depend on the floor and are drawn once.
+        rows, cols = self.mr * 2 + 1, self.mc * 3 + 1
+        floor_plan = np.full((rows, cols), ' ', dtype='U1')
+        floor_plan[0, :] = '─'
+        floor_plan[0, 0], floor_plan[0, -1] = '┌', '┐'
+        floor_plan[-1, :] = '─'
+        floor_plan[-1, 0], floor_plan[-1, -1] = '└', '┘'
+        floor_plan[1::2, 0] = '│'
+        direction_chars = '↥↧↑↓←→'
+        for hi, floor in enumerate(self.maze):
+            door_mask = self.door_mask[hi]
+            # whether each cell belongs to the same room as its neighbour on the next row / column
+            same_r = floor[:-1, :] == floor[1:, :]
+            same_c = floor[:, :-1] == floor[:, 1:]
+            # whether each cell is open (no floor / wall) towards the next floor, row and column.
+            open_h = door_mask[..., 0].copy()
+            if hi < self.mh - 1:
+                open_h |= floor == self.maze[hi + 1]
+            open_r = same_r | door_mask[:-1, :, 1]
+            open_c = door_mask[..., 2].copy()
+            open_c[:, :-1] |= same_c
+            # top and bottom boarder rows
+            floor_plan[0, 3:-1:3] = np.where(same_c[0, :], '─', '┬')
+            floor_plan[-1, 3:-1:3] = np.where(same_c[-1, :], '─', '┴')
+            # room floor rows
+            cells = np.where(open_h, ' ', '█')
+            floor_plan[1::2, 1::3] = cells
+            floor_plan[1::2, 2::3] = cells
+            floor_plan[1::2, 3::3] = np.where(open_c, ' ', '│')
+            # room boarder rows
+            floor_plan[2:-1:2, 0] = np.where(same_r[:, 0], '│', '├')
+            edges = np.where(open_r, ' ', '─')
+            floor_plan[2:-1:2, 1::3] = edges
+            floor_plan[2:-1:2, 2::3] = edges
+            floor_plan[2:-1:2, -1] = np.where(same_r[:, -1], '│', '┤')
+            # the junctions between four cells a b
+            #                                    c d
+            a, b, c, d = floor[:-1, :-1], floor[:-1, 1:], floor[1:, :-1], floor[1:, 1:]
+            floor_plan[2:-1:2, 3:-1:3] = self._JUNCTIONS[(a == b) * 1 + (a == c) * 2 + (b == d) * 4 + (c == d) * 8]
+            for (ri, ci), direction in arrows[hi]:
+                floor_plan[ri * 2 + 1, ci * 3 + 1 + direction % 2] = direction_chars[direction]
+            # view each row of characters as a single string, the floors are separated by an empty line
+            sys.stdout.write(('\n' if hi else '') + '\n'.join(floor_plan.view(f'U{cols}')[:, 0].tolist()) + '\n')